@@ -0,0 +1,21 @@
+# Gunicorn 設定檔 - 價格監控 API
+# 啟動方式：gunicorn --config gunicorn.conf.py render_範例_價格監控API:app
+#
+# 💡 gevent worker 用「綠色執行緒」讓一個程序同時服務上千個連線，
+#    特別適合這種幾乎沒有 CPU 運算的 JSON API
+
+import multiprocessing
+import os
+
+# Render 會自動設定 PORT 環境變數
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# worker 數量：CPU 核心數 x 2 + 1（常見的經驗法則）
+workers = multiprocessing.cpu_count() * 2 + 1
+
+# 使用 gevent 非同步 worker，每個 worker 最多 1000 個並行連線
+worker_class = 'gevent'
+worker_connections = 1000
+
+# 連線保持 5 秒，讓輪詢的客戶端重複使用同一條連線
+keepalive = 5
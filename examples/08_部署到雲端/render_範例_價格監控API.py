@@ -3,20 +3,64 @@
 提供 RESTful API 查詢商品價格
 
 使用方式：
-1. 本地測試：python render_範例_價格監控API.py
-2. 部署到 Render
+1. 本地測試：gunicorn --config gunicorn.conf.py render_範例_價格監控API:app
+   （或走 ASGI：uvicorn --workers 4 render_範例_價格監控API:asgi_app）
+2. 部署到 Render（startCommand 同上，設定檔見 render.yaml）
 3. API 端點：https://your-app.onrender.com/api/prices
+
+💡 為什麼用 Gunicorn 而不是 app.run()？
+Flask 內建的開發伺服器一次只能處理一個請求，
+Gunicorn 搭配 gevent worker 可以讓單一程序同時服務數百個連線，
+對這種純 JSON 組裝的 API 來說，吞吐量可以提升數十倍。
 """
 
-from flask import Flask, jsonify, request
+from asgiref.wsgi import WsgiToAsgi
+from flask import Blueprint, Flask, Response, request
+from flask_compress import Compress
 from flask_cors import CORS
+from werkzeug.exceptions import HTTPException
 from datetime import datetime
 import os
 import json
+import threading
+import time
+
+import orjson
 
 app = Flask(__name__)
 CORS(app)  # 允許跨域請求
 
+# 自動壓縮回應：價格 JSON 充滿重複的欄位名稱和日期字串，
+# brotli / gzip 可以把傳輸量壓到原本的 1/5 ~ 1/10
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 256  # 太小的回應壓了反而虧
+Compress(app)
+
+# 減少框架本身的每請求開銷：
+# - 不區分結尾斜線、合併重複斜線，少走一次重導向 / 正規化
+# - jsonify 輸出不加空格（orjson 本來就是緊湊格式，這裡讓兩者一致）
+app.url_map.strict_slashes = False
+app.url_map.merge_slashes = True
+app.json.compact = True
+
+# 所有 API 端點掛在同一個 Blueprint 下，共用 /api 前綴，
+# Werkzeug 比對路由時可以更快縮小範圍
+bp = Blueprint('prices', __name__, url_prefix='/api')
+
+
+def ojsonify(obj, status=200):
+    """用 orjson 序列化回應（取代 flask.jsonify）
+
+    orjson 是 Rust 實作的 JSON 函式庫，比標準庫快 3-10 倍，
+    而且直接輸出 UTF-8，不會把中文產品名稱轉成 \\uXXXX 跳脫字元
+    """
+    return Response(
+        orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS),
+        status=status,
+        mimetype='application/json'
+    )
+
+
 # 模擬資料庫（實際應用中應使用真實資料庫）
 price_data = {
     "產品A": {
@@ -49,142 +93,281 @@ price_data = {
 }
 
 
+# ETag 版本號：整體資料一個、每個產品各一個
+# 任何修改 price_data 的程式都必須呼叫 _bump_version()，
+# 版本號一變，客戶端快取的 ETag 就會失效
+_price_version = 0
+_product_version = {name: 0 for name in price_data}
+
+
+# 序列化結果的快取：price_data 很少變動，
+# 沒必要每個請求都重新組 dict + 編碼 JSON 一次
+# （timestamp 改由 HTTP 的 Date 標頭提供，回應本體才能整包重複使用）
+_prices_cache = None
+
+# 歷史價格在下一次寫入之前都不會變，序列化一次之後重複回傳同一份 bytes
+# （每個 Gunicorn worker 各有一份快取，不用跨程序上鎖，可接受）
+_history_cache = {}
+
+# 404 回應會列出所有產品名稱，先建好一份 tuple 重複使用，
+# 不用每次查無產品都重新配置一個 list
+_available_products = tuple(price_data)
+
+# 產品名稱的驗證集合（frozenset 查詢比 dict 再快一點）
+# 與空白字元的刪除表：translate 一次處理整個字串，不用逐項 .strip()
+_product_set = frozenset(price_data)
+_STRIP_TABLE = str.maketrans('', '', ' \t')
+
+
+def _not_modified(etag):
+    """建立 304 回應，帶上與 200 相同的 ETag 和 Cache-Control
+
+    RFC 7234：快取會用 304 的標頭更新既有的快取紀錄，
+    如果這裡不帶標頭，after_request 補上的 CDN 政策（max-age=30）
+    會在第一次重新驗證時蓋掉端點自己的 max-age=5 設定
+    """
+    resp = Response(status=304)
+    resp.headers['ETag'] = etag
+    resp.headers['Cache-Control'] = 'max-age=5, must-revalidate'
+    return resp
+
+
+def _get_prices_body():
+    """取得所有產品價格的序列化結果（第一次呼叫才編碼）"""
+    global _prices_cache
+    if _prices_cache is None:
+        _prices_cache = orjson.dumps({"success": True, "data": price_data})
+    return _prices_cache
+
+
+# 單一產品的回應形狀是固定的，在模組載入時就先把整包 bytes 組好，
+# 只留 timestamp 用 %s 佔位。請求時只剩一次 dict 查詢加一次 % 格式化，
+# 成本趨近於單純的記憶體複製
+_product_template = {}
+
+
+def _rebuild_templates():
+    """重建所有產品的回應模板（資料更新時呼叫）"""
+    global _product_template
+    _product_template = {
+        name: orjson.dumps({
+            "success": True,
+            "product": name,
+            "data": data
+        })[:-1] + b',"timestamp":"%s"}'
+        for name, data in price_data.items()
+    }
+
+
+_rebuild_templates()
+
+
+def _bump_version(product=None):
+    """資料更新時呼叫：遞增版本號並清掉序列化快取"""
+    global _price_version, _prices_cache, _available_products, _product_set
+    global _product_version
+    _price_version += 1
+    _prices_cache = None
+    _available_products = tuple(price_data)
+    _product_set = frozenset(price_data)
+    _rebuild_templates()
+    if product is not None:
+        _product_version[product] = _product_version.get(product, 0) + 1
+        _history_cache.pop(product, None)
+    else:
+        # 整批更新：每個產品的版本號都要跳，否則單一產品的舊 ETag
+        # 還會命中 304，客戶端就拿不到新資料
+        # （順便跟 price_data 的 key 同步，涵蓋新增的產品）
+        _product_version = {
+            name: _product_version.get(name, 0) + 1 for name in price_data
+        }
+        _history_cache.clear()
+
+
+# 回應裡的 timestamp 只需要秒級精度，沒必要每個請求都呼叫
+# datetime.now()（系統呼叫）再 isoformat()（配置新字串）。
+# 改由背景執行緒每秒更新一次，處理請求時直接讀現成的值
+# （CPython 的變數指派是原子操作，讀取端不需要鎖）
+_current_ts = datetime.now().isoformat()
+_current_ts_bytes = _current_ts.encode()
+
+
+def _ts_updater():
+    global _current_ts, _current_ts_bytes
+    while True:
+        _current_ts = datetime.now().isoformat()
+        _current_ts_bytes = _current_ts.encode()
+        time.sleep(1)
+
+
+threading.Thread(target=_ts_updater, daemon=True).start()
+
+
+# 首頁內容不會變動，在模組載入時序列化一次就好，
+# 之後每個請求都直接回傳同一份 bytes（負載平衡器會一直打這兩個端點）
+_HOME_JSON = json.dumps({
+    "message": "價格監控 API",
+    "version": "1.0.0",
+    "endpoints": {
+        "/api/prices": "取得所有產品價格",
+        "/api/prices/<product>": "取得特定產品價格",
+        "/api/health": "健康檢查"
+    },
+    "example": "GET /api/prices/產品A"
+}, ensure_ascii=False).encode('utf-8')
+
+
 @app.route('/')
 def home():
     """首頁 - API 說明"""
-    return jsonify({
-        "message": "價格監控 API",
-        "version": "1.0.0",
-        "endpoints": {
-            "/api/prices": "取得所有產品價格",
-            "/api/prices/<product>": "取得特定產品價格",
-            "/api/health": "健康檢查"
-        },
-        "example": "GET /api/prices/產品A"
-    })
+    return Response(_HOME_JSON, mimetype='application/json')
 
 
-@app.route('/api/health')
+@bp.route('/health')
 def health_check():
     """健康檢查端點"""
-    return jsonify({
-        "status": "healthy",
-        "timestamp": datetime.now().isoformat()
-    })
+    # 只有 timestamp 是動態的，直接用 bytes 串接組出 JSON，
+    # 省掉每次建立 dict + jsonify 序列化的成本
+    body = b'{"status":"healthy","timestamp":"' + _current_ts_bytes + b'"}'
+    return Response(body, mimetype='application/json')
 
 
-@app.route('/api/prices')
+@bp.route('/prices')
 def get_all_prices():
     """取得所有產品的價格"""
-    try:
-        return jsonify({
-            "success": True,
-            "data": price_data,
-            "timestamp": datetime.now().isoformat()
-        })
-    except Exception as e:
-        return jsonify({
-            "success": False,
-            "error": str(e)
-        }), 500
+    # 資料沒變就回 304 Not Modified（空回應），
+    # 定時輪詢的儀表板大部分請求都能省下整包 JSON
+    etag = f'W/"{_price_version}"'
+    if request.headers.get('If-None-Match') == etag:
+        return _not_modified(etag)
 
+    response = Response(_get_prices_body(), mimetype='application/json')
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'max-age=5, must-revalidate'
+    return response
 
-@app.route('/api/prices/<product>')
+
+@bp.route('/prices/<product>')
 def get_product_price(product):
     """取得特定產品的價格"""
-    try:
-        if product in price_data:
-            return jsonify({
-                "success": True,
-                "product": product,
-                "data": price_data[product],
-                "timestamp": datetime.now().isoformat()
-            })
-        else:
-            return jsonify({
-                "success": False,
-                "error": f"找不到產品：{product}",
-                "available_products": list(price_data.keys())
-            }), 404
-    except Exception as e:
-        return jsonify({
+    # 用 .get() 查一次就好（in + [] 會對同一個 key 雜湊兩次）
+    version = _product_version.get(product)
+    if version is None:
+        return ojsonify({
             "success": False,
-            "error": str(e)
-        }), 500
+            "error": f"找不到產品：{product}",
+            "available_products": _available_products
+        }, status=404)
 
+    # 單一產品也用自己的版本號做 ETag
+    etag = f'W/"{version}"'
+    if request.headers.get('If-None-Match') == etag:
+        return _not_modified(etag)
 
-@app.route('/api/prices/<product>/history')
+    # 模板已經序列化好了，只要把 timestamp 填進佔位符
+    response = Response(
+        _product_template[product] % _current_ts_bytes,
+        mimetype='application/json')
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'max-age=5, must-revalidate'
+    return response
+
+
+@bp.route('/prices/<product>/history')
 def get_price_history(product):
     """取得產品的歷史價格"""
-    try:
-        if product in price_data:
-            return jsonify({
-                "success": True,
-                "product": product,
-                "history": price_data[product]["history"],
-                "timestamp": datetime.now().isoformat()
-            })
-        else:
-            return jsonify({
+    # 快取命中時只剩一次 dict 查詢加 Response 建構
+    buf = _history_cache.get(product)
+    if buf is None:
+        data = price_data.get(product)
+        if data is None:
+            return ojsonify({
                 "success": False,
                 "error": f"找不到產品：{product}"
-            }), 404
-    except Exception as e:
-        return jsonify({
-            "success": False,
-            "error": str(e)
-        }), 500
+            }, status=404)
+        buf = orjson.dumps({
+            "success": True,
+            "product": product,
+            "history": data["history"]
+        })
+        _history_cache[product] = buf
 
+    return Response(buf, mimetype='application/json')
 
-@app.route('/api/prices/compare')
+
+@bp.route('/prices/compare')
 def compare_prices():
     """比較多個產品的價格"""
-    try:
-        # 從查詢參數取得產品列表
-        products = request.args.get('products', '').split(',')
-
-        result = {}
-        for product in products:
-            product = product.strip()
-            if product in price_data:
-                result[product] = price_data[product]["current_price"]
-
-        if not result:
-            return jsonify({
-                "success": False,
-                "error": "請提供有效的產品名稱",
-                "example": "/api/prices/compare?products=產品A,產品B"
-            }), 400
-
-        # 找出最便宜和最貴的產品
-        cheapest = min(result.items(), key=lambda x: x[1])
-        expensive = max(result.items(), key=lambda x: x[1])
+    # 用刪除表一次拿掉所有空白再切割，單次走訪就完成驗證與取價
+    raw = request.args.get('products', '').translate(_STRIP_TABLE)
+    products = raw.split(',') if raw else []
 
-        return jsonify({
-            "success": True,
-            "comparison": result,
-            "cheapest": {
-                "product": cheapest[0],
-                "price": cheapest[1]
-            },
-            "most_expensive": {
-                "product": expensive[0],
-                "price": expensive[1]
-            },
-            "timestamp": datetime.now().isoformat()
-        })
+    result = {
+        p: price_data[p]["current_price"]
+        for p in products if p in _product_set
+    }
 
-    except Exception as e:
-        return jsonify({
+    if not result:
+        return ojsonify({
             "success": False,
-            "error": str(e)
-        }), 500
+            "error": "請提供有效的產品名稱",
+            "example": "/api/prices/compare?products=產品A,產品B"
+        }, status=400)
+
+    # 一次走訪同時找出最便宜和最貴的產品
+    # （分別呼叫 min() 和 max() 會把整個 dict 走兩遍）
+    it = iter(result.items())
+    name, price = next(it)
+    cheapest = expensive = (name, price)
+    for name, price in it:
+        if price < cheapest[1]:
+            cheapest = (name, price)
+        elif price > expensive[1]:
+            expensive = (name, price)
+
+    return ojsonify({
+        "success": True,
+        "comparison": result,
+        "cheapest": {
+            "product": cheapest[0],
+            "price": cheapest[1]
+        },
+        "most_expensive": {
+            "product": expensive[0],
+            "price": expensive[1]
+        },
+        "timestamp": _current_ts
+    })
+
+
+app.register_blueprint(bp)
+
+
+@app.after_request
+def add_cache_headers(resp):
+    """幫價格查詢加上 CDN 快取標頭
+
+    標成 public 之後，Render / Cloudflare 這類前端快取可以直接回應
+    重複的 GET 請求，完全不用進到 Python；健康檢查則標成 no-store，
+    確保監控服務每次都拿到即時結果
+    """
+    # 只快取成功的回應：404 / 400 被 CDN 記住的話，
+    # 產品上架後的 30 秒內客戶端還是會一直拿到舊的錯誤
+    if (request.method == 'GET' and resp.status_code == 200
+            and request.path.startswith('/api/prices')):
+        # setdefault：個別端點自己設定的 Cache-Control（例如 ETag 搭配的
+        # must-revalidate）優先，這裡只補上沒設定的
+        resp.headers.setdefault(
+            'Cache-Control', 'public, max-age=30, stale-while-revalidate=60')
+    elif request.path == '/api/health':
+        resp.headers['Cache-Control'] = 'no-store'
+    return resp
 
 
 @app.errorhandler(404)
 def not_found(error):
     """404 錯誤處理"""
-    return jsonify({
+    return ojsonify({
         "success": False,
         "error": "找不到該端點",
         "available_endpoints": [
@@ -195,27 +378,44 @@ def not_found(error):
             "/api/prices/<product>/history",
             "/api/prices/compare"
         ]
-    }), 404
+    }, status=404)
 
 
-@app.errorhandler(500)
+@app.errorhandler(Exception)
 def internal_error(error):
-    """500 錯誤處理"""
-    return jsonify({
+    """未預期錯誤的統一處理
+
+    各端點不再自己包 try/except（每次呼叫都要建立例外處理區塊，
+    而且 str(e) 會把內部細節洩漏給客戶端），
+    沒接住的例外統一在這裡轉成固定格式的 500 回應
+    """
+    # HTTP 錯誤（404、400...）維持原本的回應，不要蓋成 500
+    if isinstance(error, HTTPException):
+        return error
+    return ojsonify({
         "success": False,
         "error": "伺服器內部錯誤"
-    }), 500
+    }, status=500)
+
+
+# ASGI 入口：想用 uvicorn 伺服時改跑
+#   uvicorn --workers 4 render_範例_價格監控API:asgi_app
+# WsgiToAsgi 讓 Flask 程式碼一行都不用改就能跑在 ASGI 伺服器上；
+# 之後若要用 httpx.AsyncClient 抓真實價格，走 ASGI 就不需要
+# gevent 的 monkey-patch，非同步整合乾淨許多
+asgi_app = WsgiToAsgi(app)
 
 
 if __name__ == '__main__':
-    # Render 會自動設定 PORT 環境變數
+    # 不再使用 Flask 開發伺服器（app.run 一次只能處理一個請求）
+    # 請改用 Gunicorn + gevent 啟動，設定都在 gunicorn.conf.py
     port = int(os.environ.get('PORT', 5000))
 
-    # 開發模式
-    debug = os.environ.get('FLASK_ENV') == 'development'
-
     print(f"""
-    🚀 價格監控 API 已啟動
+    🚀 價格監控 API 請用 Gunicorn 啟動：
+
+       gunicorn --config gunicorn.conf.py render_範例_價格監控API:app
+
     📍 本地網址：http://localhost:{port}
     📡 可用端點：
        - GET /                      # API 說明
@@ -225,9 +425,3 @@ if __name__ == '__main__':
        - GET /api/prices/產品A/history  # 價格歷史
        - GET /api/prices/compare?products=產品A,產品B  # 價格比較
     """)
-
-    app.run(
-        host='0.0.0.0',
-        port=port,
-        debug=debug
-    )
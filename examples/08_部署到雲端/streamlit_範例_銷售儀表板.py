@@ -9,6 +9,7 @@
 """
 
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -29,63 +30,126 @@ st.markdown("---")
 # 載入資料
 
 
+def _optimize_dtypes(df):
+    """壓縮欄位型別，減少記憶體並加速 groupby
+
+    產品只有少數幾種，轉成 category 後底層只存小整數代碼，
+    groupby 就不用一直對 Python 字串做雜湊
+    """
+    if '產品' in df.columns:
+        df['產品'] = df['產品'].astype('category')
+    for col in ('數量', '金額'):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    return df
+
+
+def _add_date_columns(df):
+    """從日期衍生出年、月、年月欄位
+
+    直接從整數年、月組出 '2024-01' 這種字串，
+    比走 dt.to_period('M') 再轉字串快好幾倍
+    """
+    if '日期' in df.columns:
+        df['年'] = df['日期'].dt.year.astype('int16')
+        df['月'] = df['日期'].dt.month.astype('int8')
+        df['年月'] = df['年'].astype(str) + '-' + df['月'].astype(str).str.zfill(2)
+    return df
+
+
 @st.cache_data
 def load_data():
     """載入銷售資料"""
     # 嘗試從不同路徑載入
-    possible_paths = [
-        "data/sales.csv",
-        "../data/sales.csv",
-        "../../data/sales.csv"
-    ]
-
-    for path in possible_paths:
-        if os.path.exists(path):
-            df = pd.read_csv(path)
+    possible_dirs = ["data", "../data", "../../data"]
+
+    for folder in possible_dirs:
+        # 優先讀 Parquet：欄位式儲存，日期直接是 datetime 不用再轉，
+        # 讀取速度比 CSV 快好幾倍（可用 df.to_parquet() 先轉檔一次）
+        parquet_path = os.path.join(folder, "sales.parquet")
+        if os.path.exists(parquet_path):
+            return _add_date_columns(
+                _optimize_dtypes(pd.read_parquet(parquet_path)))
+
+        csv_path = os.path.join(folder, "sales.csv")
+        if os.path.exists(csv_path):
+            # engine='pyarrow'：用 Arrow 的多執行緒解析器讀 CSV，
+            # 大檔案比預設的單執行緒 C 解析器快 3-10 倍
+            df = pd.read_csv(csv_path, engine='pyarrow')
             # 確保日期格式正確
             if '日期' in df.columns:
                 df['日期'] = pd.to_datetime(df['日期'])
             elif 'date' in df.columns:
                 df['date'] = pd.to_datetime(df['date'])
-            return df
+            # 衍生欄位在這裡算好，會跟著 @st.cache_data 一起被快取，
+            # 之後每次操作畫面元件就不用重算整張表
+            return _add_date_columns(_optimize_dtypes(df))
 
     # 如果找不到檔案，使用範例資料
     st.warning("⚠️ 找不到 sales.csv，使用範例資料")
-    return create_sample_data()
+    return _add_date_columns(_optimize_dtypes(create_sample_data()))
+
+
+# 圖表用的彙總結果也快取起來：同一組篩選條件只算一次 groupby，
+# 而且傳給 Plotly 的只有十幾列小計，不是整張原始資料
+# （Plotly 會把收到的每一列都轉成 JSON 送進瀏覽器）
+
+
+@st.cache_data
+def monthly_sales_cached(df, year, product):
+    """每月銷售額小計（依年份與產品快取）"""
+    sub = df if year is None else df[df['年'] == year]
+    if product != '全部':
+        sub = sub[sub['產品'] == product]
+    return sub.groupby('年月', as_index=False)['金額'].sum()
+
+
+@st.cache_data
+def product_sales_cached(df, year, product):
+    """各產品銷售額排名（依年份與產品快取）"""
+    sub = df if year is None else df[df['年'] == year]
+    if product != '全部':
+        sub = sub[sub['產品'] == product]
+    return sub.groupby('產品', observed=True)[
+        '金額'].sum().sort_values(ascending=False).head(10)
+
+
+@st.cache_data
+def to_csv_bytes(df):
+    """把 DataFrame 轉成下載用的 CSV bytes（依內容快取）
+
+    下載按鈕很少被按，但 to_csv 以前每次重新整理畫面都會執行；
+    快取後同一組篩選結果只會轉檔一次
+    """
+    return df.to_csv(index=False).encode('utf-8-sig')
 
 
 def create_sample_data():
     """建立範例資料"""
+    # 用 NumPy 一次產生所有隨機數，不用 Python 迴圈一筆一筆建 dict
+    # （366 天 x 5 個產品 = 1830 筆，向量化比逐筆快上百倍）
     dates = pd.date_range(start='2024-01-01', end='2024-12-31', freq='D')
     products = ['產品A', '產品B', '產品C', '產品D', '產品E']
 
-    data = []
-    for date in dates:
-        for product in products:
-            data.append({
-                '日期': date,
-                '產品': product,
-                '數量': pd.np.random.randint(10, 100),
-                '金額': pd.np.random.randint(1000, 10000)
-            })
+    idx = pd.MultiIndex.from_product([dates, products], names=['日期', '產品'])
+    rng = np.random.default_rng()
+    n = len(idx)
 
-    return pd.DataFrame(data)
+    return pd.DataFrame({
+        '數量': rng.integers(10, 100, n),
+        '金額': rng.integers(1000, 10000, n)
+    }, index=idx).reset_index()
 
 
 # 載入資料
 try:
-    df = load_data()
-
-    # 資料預處理
-    if '日期' in df.columns:
-        df['年月'] = df['日期'].dt.to_period('M').astype(str)
-        df['年'] = df['日期'].dt.year
-        df['月'] = df['日期'].dt.month
+    df = load_data()  # 年、月、年月欄位已在 load_data 裡算好並快取
 
     # 側邊欄 - 篩選器
     st.sidebar.header("📋 資料篩選")
 
     # 年份篩選
+    selected_year = None
     if '年' in df.columns:
         years = sorted(df['年'].unique())
         selected_year = st.sidebar.selectbox("選擇年份", years, index=len(years)-1)
@@ -94,6 +158,7 @@ try:
         df_filtered = df
 
     # 產品篩選
+    selected_product = '全部'
     if '產品' in df.columns:
         all_products = ['全部'] + sorted(df_filtered['產品'].unique().tolist())
         selected_product = st.sidebar.selectbox("選擇產品", all_products)
@@ -132,7 +197,8 @@ try:
     with col1:
         st.subheader("📈 每月銷售趨勢")
         if '年月' in df_filtered.columns:
-            monthly_sales = df_filtered.groupby('年月')['金額'].sum().reset_index()
+            monthly_sales = monthly_sales_cached(
+                df, selected_year, selected_product)
             fig1 = px.line(
                 monthly_sales,
                 x='年月',
@@ -150,8 +216,8 @@ try:
     with col2:
         st.subheader("🏆 產品銷售排名")
         if '產品' in df_filtered.columns:
-            product_sales = df_filtered.groupby(
-                '產品')['金額'].sum().sort_values(ascending=False).head(10)
+            product_sales = product_sales_cached(
+                df, selected_year, selected_product)
             fig2 = px.bar(
                 x=product_sales.values,
                 y=product_sales.index,
@@ -167,7 +233,7 @@ try:
 
     # 統計摘要
     if '產品' in df_filtered.columns:
-        summary = df_filtered.groupby('產品').agg({
+        summary = df_filtered.groupby('產品', observed=True).agg({
             '數量': 'sum',
             '金額': ['sum', 'mean', 'count']
         }).round(2)
@@ -183,8 +249,8 @@ try:
         st.info("💡 提示：你可以直接在表格上排序和篩選資料")
 
     with col2:
-        # 轉換為 CSV
-        csv = df_filtered.to_csv(index=False, encoding='utf-8-sig')
+        # 轉換為 CSV（結果有快取，不會每次重新整理都重轉）
+        csv = to_csv_bytes(df_filtered)
         st.download_button(
             label="📥 下載篩選後的資料",
             data=csv,